@@ -1,420 +1,623 @@
-import pandas as pd
-import os
-import glob
-from pathlib import Path
-import msoffcrypto
-import io
-from datetime import datetime
-import logging
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill, Border, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
-
-class ExcelMerger:
-    def __init__(self, default_password="8888"):
-        """
-        Initialize Excel Merger
-        
-        Args:
-            default_password (str): Default password to try for protected files
-        """
-        self.default_password = default_password
-        self.setup_logging()
-        
-    def setup_logging(self):
-        """Set up logging configuration"""
-        # Create logs directory if it doesn't exist
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-        
-        # Set up logging
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        log_filename = f'logs/excel_merger_{timestamp}.log'
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_filename, encoding='utf-8'),
-                logging.StreamHandler()  # Also print to console
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
-        self.logger.info(f"Excel Merger started - Log file: {log_filename}")
-    
-    def is_password_protected(self, file_path):
-        """
-        Check if Excel file is password protected
-        
-        Args:
-            file_path (str): Path to Excel file
-            
-        Returns:
-            bool: True if password protected, False otherwise
-        """
-        try:
-            # Try to read without password first
-            pd.read_excel(file_path, nrows=0)  # Just read header
-            return False
-        except Exception as e:
-            error_msg = str(e).lower()
-            if 'password' in error_msg or 'encrypted' in error_msg or 'protected' in error_msg:
-                return True
-            # Try with msoffcrypto to detect encryption
-            try:
-                with open(file_path, 'rb') as file:
-                    office_file = msoffcrypto.OfficeFile(file)
-                    if office_file.is_encrypted():
-                        return True
-            except:
-                pass
-            return False
-    
-    def read_excel_with_formatting(self, file_path, password=None):
-        """
-        Read Excel file with formatting preserved using openpyxl
-        
-        Args:
-            file_path (str): Path to the Excel file
-            password (str): Password for protected files (optional)
-            
-        Returns:
-            tuple: (openpyxl.Worksheet or None, success_status, error_message)
-        """
-        filename = os.path.basename(file_path)
-        
-        try:
-            if password:
-                # Handle password-protected files
-                with open(file_path, 'rb') as file:
-                    office_file = msoffcrypto.OfficeFile(file)
-                    office_file.load_key(password=password)
-                    
-                    decrypted = io.BytesIO()
-                    
-                    # Try both methods for compatibility
-                    try:
-                        office_file.save(decrypted)  # Older version
-                    except AttributeError:
-                        office_file.decrypt(decrypted)  # Newer version
-                    
-                    decrypted.seek(0)
-                    workbook = load_workbook(decrypted)
-                    worksheet = workbook.active
-                    
-                    return worksheet, True, None
-            else:
-                # Handle regular files
-                workbook = load_workbook(file_path)
-                worksheet = workbook.active
-                return worksheet, True, None
-                
-        except Exception as e:
-            error_msg = str(e)
-            self.logger.error(f"❌ {filename} - Failed to read with formatting: {error_msg}")
-            return None, False, error_msg
-
-    def copy_cell_formatting(self, source_cell, target_cell):
-        """
-        Copy formatting from source cell to target cell
-        """
-        if source_cell.font:
-            target_cell.font = Font(
-                name=source_cell.font.name,
-                size=source_cell.font.size,
-                bold=source_cell.font.bold,
-                italic=source_cell.font.italic,
-                underline=source_cell.font.underline,
-                strike=source_cell.font.strike,
-                color=source_cell.font.color
-            )
-        
-        if source_cell.fill:
-            target_cell.fill = PatternFill(
-                fill_type=source_cell.fill.fill_type,
-                start_color=source_cell.fill.start_color,
-                end_color=source_cell.fill.end_color
-            )
-        
-        if source_cell.border:
-            target_cell.border = Border(
-                left=source_cell.border.left,
-                right=source_cell.border.right,
-                top=source_cell.border.top,
-                bottom=source_cell.border.bottom
-            )
-        
-        if source_cell.alignment:
-            target_cell.alignment = Alignment(
-                horizontal=source_cell.alignment.horizontal,
-                vertical=source_cell.alignment.vertical,
-                wrap_text=source_cell.alignment.wrap_text
-            )
-    
-    def is_header_row(self, row):
-        """
-        Check if a row looks like a header row
-        Header rows typically contain text like: 跟团号, 下单人, 团员备注, etc.
-        """
-        header_keywords = ['跟团号', '下单人', '团员备注', '支付时间', '团长备注', '商品', 
-                          '订单金额', '退款金额', '订单状态', '自提点', '收货人', '联系电话', '详细地址']
-        
-        row_values = [str(cell.value).strip() if cell.value is not None else '' for cell in row]
-        
-        # Check if at least 3 header keywords are found in this row
-        matching_keywords = sum(1 for keyword in header_keywords if any(keyword in value for value in row_values))
-        
-        return matching_keywords >= 3
-    
-    def extract_header_from_row(self, row):
-        """
-        Extract header values from a detected header row
-        
-        Args:
-            row: openpyxl row object
-            
-        Returns:
-            list: List of header values
-        """
-        header_values = []
-        for cell in row:
-            if cell.value is not None:
-                header_values.append(str(cell.value).strip())
-            else:
-                header_values.append('')
-        return header_values
-
-    def merge_excel_files_with_formatting(self, folder_path=".", output_file='1.xlsx'):
-        """
-        Merge multiple Excel files with formatting preserved
-        
-        Args:
-            folder_path (str): Path to folder containing Excel files
-            output_file (str): Name of output file
-        """
-        
-        self.logger.info(f"📂 开始处理该文件夹里的表格: {os.path.abspath(folder_path)}")
-        
-        # Find all Excel files in the current directory
-        excel_extensions = ['*.xlsx', '*.xls', '*.xlsm']
-        excel_files = []
-        
-        for extension in excel_extensions:
-            excel_files.extend(glob.glob(os.path.join(folder_path, extension)))
-        
-        # Remove the output file from the list if it exists
-        excel_files = [f for f in excel_files if not f.endswith(output_file)]
-        
-        if not excel_files:
-            self.logger.warning(f"⚠️ 在 {folder_path} 中未找到 Excel 文件")
-            return
-
-        self.logger.info(f"📋 找到 {len(excel_files)} 个 Excel 文件进行处理")
-
-        # Create new workbook for output
-        output_workbook = Workbook()
-        output_worksheet = output_workbook.active
-        output_worksheet.title = "Merged Data"
-        
-        successful_files = []
-        failed_files = []
-        current_row = 1
-        header_added = False
-        detected_headers = None  # Store the actual headers from source files
-        
-        # Process each file
-        for i, file_path in enumerate(excel_files):
-            filename = os.path.basename(file_path)
-            self.logger.info(f"📖 开始处理文件: {i+1}/{len(excel_files)}: {filename}")
-            
-            # Determine if file is password protected
-            is_protected = self.is_password_protected(file_path)
-            password = self.default_password if is_protected else None
-            
-            # Read with formatting preserved
-            worksheet, success, error = self.read_excel_with_formatting(file_path, password)
-            
-            if success and worksheet is not None:
-                rows_data = list(worksheet.iter_rows())
-                
-                # Debug logging
-                self.logger.info(f"🔍 {filename} - Total rows found: {len(rows_data)}")
-                
-                # Check if worksheet has any rows
-                if len(rows_data) == 0:
-                    self.logger.warning(f"⚠️ {filename} - 文件完全为空，跳过")
-                    failed_files.append((filename, "文件完全为空"))
-                    continue
-                
-                # Find header row and data rows
-                header_row_index = -1
-                data_rows = []
-                
-                # Look for header row
-                for idx, row in enumerate(rows_data):
-                    if self.is_header_row(row):
-                        header_row_index = idx
-                        self.logger.info(f"🔍 {filename} - Header found at row {idx + 1}")
-                        break
-                
-                if header_row_index >= 0:
-                    # Found header, get data rows after header
-                    header_row = rows_data[header_row_index]
-                    
-                    # Extract and store header values if not done yet
-                    if detected_headers is None:
-                        detected_headers = self.extract_header_from_row(header_row)
-                        self.logger.info(f"🔍 {filename} - Detected headers: {detected_headers[:5]}...")  # Show first 5
-                    
-                    potential_data_rows = rows_data[header_row_index + 1:]
-                    
-                    # Filter non-empty data rows
-                    for row in potential_data_rows:
-                        row_values = [cell.value for cell in row if cell.value is not None and str(cell.value).strip() != '']
-                        if row_values:  # Row has actual data
-                            data_rows.append(row)
-
-                    self.logger.info(f"🔍 {filename} - 找到 {len(data_rows)} 行数据")
-
-                else:
-                    # No header found, treat all non-empty rows as data
-                    self.logger.info(f"🔍 {filename} - 未找到标题，将所有行视为数据")
-                    for row in rows_data:
-                        row_values = [cell.value for cell in row if cell.value is not None and str(cell.value).strip() != '']
-                        if row_values:  # Row has actual data
-                            data_rows.append(row)
-                
-                # Add header if not added yet and we have detected headers
-                if not header_added and detected_headers is not None:
-                    # Write the actual detected headers
-                    for col_idx, header_value in enumerate(detected_headers, 1):
-                        target_cell = output_worksheet.cell(row=current_row, column=col_idx)
-                        target_cell.value = header_value
-                        
-                        # Apply header formatting if we have the original header row
-                        if header_row_index >= 0:
-                            source_cell = rows_data[header_row_index][col_idx - 1] if col_idx - 1 < len(rows_data[header_row_index]) else None
-                            if source_cell:
-                                self.copy_cell_formatting(source_cell, target_cell)
-                            else:
-                                # Apply basic header formatting
-                                target_cell.font = Font(bold=True)
-                        else:
-                            # Apply basic header formatting
-                            target_cell.font = Font(bold=True)
-                    
-                    current_row += 1
-                    header_added = True
-                    self.logger.info(f"📝 {filename} - 添加检测到的标题行并带有格式")
-                
-                # Add data rows
-                if data_rows:
-                    for row in data_rows:
-                        for col_idx, cell in enumerate(row, 1):
-                            target_cell = output_worksheet.cell(row=current_row, column=col_idx)
-                            target_cell.value = cell.value
-                            self.copy_cell_formatting(cell, target_cell)
-                        current_row += 1
-                    
-                    successful_files.append(filename)
-                    self.logger.info(f"✅ {filename} - 添加 {len(data_rows)} 行数据并带有格式")
-
-                else:
-                    self.logger.warning(f"⚠️ {filename} - 未找到数据行，跳过")
-                    failed_files.append((filename, "未找到数据行"))
-
-            else:
-                failed_files.append((filename, error))
-        
-        # Auto-adjust column widths
-        self.logger.info("📐 自动调整列宽...")
-        for column in output_worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
-            output_worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        # Generate summary report
-        self.generate_summary_report(successful_files, failed_files)
-        
-        if successful_files:
-            # Save the formatted workbook
-            output_workbook.save(output_file)
-            
-            total_data_rows = current_row - 2 if header_added else 0  # Subtract header
-            self.logger.info(f"🎉 成功合并 {len(successful_files)} 个文件并保留格式")
-            self.logger.info(f"📊 合并文件中的总数据行数: {total_data_rows}")
-            self.logger.info(f"💾 输出保存为: {output_file}")
-
-        else:
-            self.logger.error("❌ 未成功读取任何文件中的数据")
-
-        output_workbook.close()
-    
-    def generate_summary_report(self, successful_files, failed_files):
-        """Generate a summary report of the merge process"""
-        
-        self.logger.info("=" * 60)
-        self.logger.info("📊 MERGE SUMMARY REPORT")
-        self.logger.info("=" * 60)
-
-        self.logger.info(f"✅ 成功处理文件 ({len(successful_files)}):")
-        if successful_files:
-            for i, filename in enumerate(successful_files, 1):
-                self.logger.info(f"   {i}. {filename}")
-        else:
-            self.logger.info("   None")
-
-        self.logger.info(f"\n❌ 处理失败的文件 ({len(failed_files)}):")
-        if failed_files:
-            for i, (filename, error) in enumerate(failed_files, 1):
-                self.logger.info(f"   {i}. {filename} - 原因: {error}")
-        else:
-            self.logger.info("   None")
-        
-        success_rate = len(successful_files) / (len(successful_files) + len(failed_files)) * 100 if (successful_files or failed_files) else 0
-        self.logger.info(f"\n📈 成功率: {success_rate:.1f}%")
-        self.logger.info("=" * 60)
-
-def main():
-    """
-    Main function to run the Excel merger automatically
-    """
-    # Configuration - SET YOUR PASSWORD HERE
-    DEFAULT_PASSWORD = "8888"  # Change this to your actual password
-    OUTPUT_FILE = "1.xlsx"
-    
-    print("🚀 自动化 Excel 文件合并器")
-    print("=" * 50)
-    print("此脚本将会：")
-    print("- 自动检测当前目录下的 Excel 文件")
-    print("- 自动检测文件是否加密")
-    print("- 合并所有文件（不重复表头）")
-    print("- 生成详细的日志文件")
-    print("=" * 50)
-    
-    # Create merger instance
-    merger = ExcelMerger(default_password=DEFAULT_PASSWORD)
-    
-    # Run the merger with formatting preserved
-    merger.merge_excel_files_with_formatting(folder_path=".", output_file=OUTPUT_FILE)
-
-    print("\n✨ 处理完成！请查看日志文件以获取详细信息。")
-
-if __name__ == "__main__":
-    # Check required packages
-    try:
-        import pandas as pd
-        import msoffcrypto
-        from openpyxl import Workbook, load_workbook
-        from openpyxl.styles import Font, PatternFill, Border, Alignment
-    except ImportError as e:
-        print("缺少必要的包。请使用以下命令安装：")
-        print("pip install pandas openpyxl msoffcrypto-tool")
-        print(f"错误: {e}")
-        exit(1)
-    
+import os
+import glob
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+import io
+import tempfile
+from datetime import datetime
+from itertools import chain, islice
+import logging
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Alignment
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+# Optional fast reader: calamine parses xlsx in native (Rust) code,
+# several times faster than openpyxl even in read-only mode. This is the
+# same engine polars/fastexcel wrap for their read_excel paths - using
+# python_calamine directly gets the Rust parser without pulling in a
+# dataframe library the merge loop would immediately convert back to row
+# tuples. openpyxl stays the fallback.
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+
+def _normalize_calamine_row(row):
+    """
+    Map calamine cell values onto what openpyxl would have produced
+
+    calamine reports empty cells as '' and all numbers as floats; the
+    merge logic expects None for empties and ints where Excel stored
+    whole numbers.
+    """
+    normalized = []
+    for value in row:
+        if value == '':
+            value = None
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        normalized.append(value)
+    return tuple(normalized)
+
+
+# Decrypted payloads up to this size stay in memory; anything larger is
+# spilled to an on-disk temp file so huge inputs don't double their
+# footprint in RAM
+_DECRYPT_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _decrypt_to_buffer(file_path, password):
+    """
+    Decrypt a password-protected Office file into a temporary buffer
+
+    Small files are decrypted into memory; large ones roll over to an
+    on-disk temp file automatically (deleted when the buffer is closed).
+
+    Args:
+        file_path (str): Path to the encrypted file
+        password (str): Password to decrypt with
+
+    Returns:
+        file-like object positioned at the start of the decrypted data
+    """
+    import msoffcrypto
+
+    with open(file_path, 'rb') as file:
+        office_file = msoffcrypto.OfficeFile(file)
+        office_file.load_key(password=password)
+
+        decrypted = tempfile.SpooledTemporaryFile(max_size=_DECRYPT_SPOOL_MAX_BYTES)
+
+        # Try both methods for compatibility
+        try:
+            office_file.save(decrypted)  # Older version
+        except AttributeError:
+            office_file.decrypt(decrypted)  # Newer version
+
+    decrypted.seek(0)
+    return decrypted
+
+
+def _read_excel_values(file_path, default_password):
+    """
+    Process-pool worker: read one workbook's value rows
+
+    Runs in a separate process, so it cannot touch the merger instance or
+    its logger - results and errors travel back as plain picklable values.
+
+    Args:
+        file_path (str): Path to the Excel file
+        default_password (str): Password to try if the file is encrypted
+
+    Returns:
+        tuple: (list of row value tuples or None, password used or None,
+                error message or None)
+    """
+    password = None
+    try:
+        # Plain .xlsx/.xlsm files are zip archives and can never be
+        # encrypted - only OLE compound documents need msoffcrypto, so
+        # the common case skips importing it entirely
+        with open(file_path, 'rb') as file:
+            magic = file.read(8)
+        if magic == b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1':
+            import msoffcrypto
+            with open(file_path, 'rb') as file:
+                office_file = msoffcrypto.OfficeFile(file)
+                if office_file.is_encrypted():
+                    password = default_password
+
+        source = _decrypt_to_buffer(file_path, password) if password else file_path
+
+        if CalamineWorkbook is not None:
+            if password:
+                calamine_workbook = CalamineWorkbook.from_filelike(source)
+            else:
+                calamine_workbook = CalamineWorkbook.from_path(file_path)
+            # skip_empty_area must stay off: trimming leading empty
+            # rows/columns would shift row indices, and the header row
+            # index is later used to re-open the sheet with openpyxl
+            # (absolute coordinates) to copy the header styling
+            raw_rows = calamine_workbook.get_sheet_by_index(0).to_python(skip_empty_area=False)
+            return [_normalize_calamine_row(row) for row in raw_rows], password, None
+
+        workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+        try:
+            rows = list(workbook.active.iter_rows(values_only=True))
+        finally:
+            # Read-only workbooks hold the zip handle open until closed -
+            # release it even when row iteration blows up
+            workbook.close()
+        return rows, password, None
+
+    except Exception as e:
+        return None, password, str(e)
+
+
+class ExcelMerger:
+    def __init__(self, default_password="8888", verbose=True):
+        """
+        Initialize Excel Merger
+
+        Args:
+            default_password (str): Default password to try for protected files
+            verbose (bool): When False, skip the decorative banner lines in
+                the summary report and log only the numeric statistics
+        """
+        self.default_password = default_password
+        self.verbose = verbose
+        self.setup_logging()
+
+        # Memoization tables for copy_cell_formatting - openpyxl interns
+        # style components per workbook, so id() is a stable key and most
+        # cells share a handful of styles. Reusing one Python object per
+        # distinct source style also lets openpyxl collapse the output
+        # styles.xml table by equality.
+        self._font_cache = {}
+        self._fill_cache = {}
+        self._border_cache = {}
+        self._align_cache = {}
+
+        # Keywords that identify a header row - hoisted here so the list is
+        # built once instead of per scanned row
+        self.header_keywords = ['跟团号', '下单人', '团员备注', '支付时间', '团长备注', '商品',
+                                '订单金额', '退款金额', '订单状态', '自提点', '收货人', '联系电话', '详细地址']
+
+
+    def setup_logging(self):
+        """Set up logging configuration"""
+        # Create logs directory if it doesn't exist
+        if not os.path.exists('logs'):
+            os.makedirs('logs')
+        
+        # Set up logging
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        log_filename = f'logs/excel_merger_{timestamp}.log'
+        
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(log_filename, encoding='utf-8'),
+                logging.StreamHandler()  # Also print to console
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f"Excel Merger started - Log file: {log_filename}")
+    
+    def read_excel_with_formatting(self, file_path, password=None, read_only=True):
+        """
+        Read Excel file using openpyxl
+
+        By default the workbook is opened in read-only mode, which streams
+        cells lazily instead of building the full cell/style object tree.
+        This is dramatically faster and lighter on large sheets. Pass
+        read_only=False only when cell formatting objects are needed
+        (e.g. to copy the header row styling).
+
+        Args:
+            file_path (str): Path to the Excel file
+            password (str): Password for protected files (optional)
+            read_only (bool): Open in read-only streaming mode (default True)
+
+        Returns:
+            tuple: (openpyxl.Worksheet or None, success_status, error_message)
+        """
+        filename = os.path.basename(file_path)
+
+        # Read-only mode only needs values; skip formulas and external links
+        load_kwargs = {'read_only': True, 'data_only': True, 'keep_links': False} if read_only else {}
+
+        try:
+            # Password-protected files are decrypted into a spooled buffer
+            # first; plain files open straight from disk
+            source = _decrypt_to_buffer(file_path, password) if password else file_path
+            workbook = load_workbook(source, **load_kwargs)
+            worksheet = workbook.active
+            return worksheet, True, None
+
+        except Exception as e:
+            error_msg = str(e)
+            self.logger.error(f"❌ {filename} - Failed to read with formatting: {error_msg}")
+            return None, False, error_msg
+
+    def copy_cell_formatting(self, source_cell, target_cell):
+        """
+        Copy formatting from source cell to target cell
+
+        Style objects are memoized per distinct source style, so cells
+        sharing a style (the common case) reuse one Font/PatternFill/
+        Border/Alignment instance instead of allocating fresh copies.
+        Cells on the workbook default style are skipped outright.
+        """
+        # Default-styled cells (style index 0) have nothing worth copying -
+        # one attribute check turns this into a no-op for unstyled sheets
+        if not source_cell.has_style:
+            return
+
+        source_font = source_cell.font
+        if source_font:
+            cached = self._font_cache.get(id(source_font))
+            if cached is None:
+                cached = Font(
+                    name=source_font.name,
+                    size=source_font.size,
+                    bold=source_font.bold,
+                    italic=source_font.italic,
+                    underline=source_font.underline,
+                    strike=source_font.strike,
+                    color=source_font.color
+                )
+                self._font_cache[id(source_font)] = cached
+            target_cell.font = cached
+
+        source_fill = source_cell.fill
+        if source_fill:
+            cached = self._fill_cache.get(id(source_fill))
+            if cached is None:
+                cached = PatternFill(
+                    fill_type=source_fill.fill_type,
+                    start_color=source_fill.start_color,
+                    end_color=source_fill.end_color
+                )
+                self._fill_cache[id(source_fill)] = cached
+            target_cell.fill = cached
+
+        source_border = source_cell.border
+        if source_border:
+            cached = self._border_cache.get(id(source_border))
+            if cached is None:
+                cached = Border(
+                    left=source_border.left,
+                    right=source_border.right,
+                    top=source_border.top,
+                    bottom=source_border.bottom
+                )
+                self._border_cache[id(source_border)] = cached
+            target_cell.border = cached
+
+        source_alignment = source_cell.alignment
+        if source_alignment:
+            cached = self._align_cache.get(id(source_alignment))
+            if cached is None:
+                cached = Alignment(
+                    horizontal=source_alignment.horizontal,
+                    vertical=source_alignment.vertical,
+                    wrap_text=source_alignment.wrap_text
+                )
+                self._align_cache[id(source_alignment)] = cached
+            target_cell.alignment = cached
+    
+    def is_header_row(self, row):
+        """
+        Check if a row looks like a header row
+        Header rows typically contain text like: 跟团号, 下单人, 团员备注, etc.
+
+        Args:
+            row: tuple of cell values (from iter_rows(values_only=True))
+        """
+        # Join the row with a separator that never occurs in cell text, so
+        # each keyword costs one substring scan over one string instead of
+        # a scan per cell - and cells are stringified once per row
+        joined = '\x1f'.join(str(value) for value in row if value is not None)
+
+        # Check if at least 3 header keywords are found in this row
+        matching_keywords = sum(1 for keyword in self.header_keywords if keyword in joined)
+
+        return matching_keywords >= 3
+
+    def extract_header_from_row(self, row):
+        """
+        Extract header values from a detected header row
+
+        Args:
+            row: tuple of cell values (from iter_rows(values_only=True))
+
+        Returns:
+            list: List of header values
+        """
+        header_values = []
+        for value in row:
+            if value is not None:
+                header_values.append(str(value).strip())
+            else:
+                header_values.append('')
+        return header_values
+
+    def merge_excel_files_with_formatting(self, folder_path=".", output_file='1.xlsx'):
+        """
+        Merge multiple Excel files with formatting preserved
+        
+        Args:
+            folder_path (str): Path to folder containing Excel files
+            output_file (str): Name of output file
+        """
+        
+        self.logger.info(f"📂 开始处理该文件夹里的表格: {os.path.abspath(folder_path)}")
+        
+        # Find all Excel files in the current directory
+        excel_extensions = ['*.xlsx', '*.xls', '*.xlsm']
+        excel_files = []
+        
+        for extension in excel_extensions:
+            excel_files.extend(glob.glob(os.path.join(folder_path, extension)))
+        
+        # Remove the output file from the list if it exists
+        excel_files = [f for f in excel_files if not f.endswith(output_file)]
+        
+        if not excel_files:
+            self.logger.warning(f"⚠️ 在 {folder_path} 中未找到 Excel 文件")
+            return
+
+        self.logger.info(f"📋 找到 {len(excel_files)} 个 Excel 文件进行处理")
+
+        # Buffer output rows and header styling - the workbook itself is
+        # created write-only at save time, once column widths are known
+        output_rows = []
+        header_values_out = None       # Detected header values for the output
+        formatted_header_cells = None  # Formatted source cells for header styling
+        col_max_len = defaultdict(int)  # Running per-column display width maxima
+
+        successful_files = []
+        failed_files = []
+        header_added = False
+        detected_headers = None  # Store the actual headers from source files
+        
+        # Read all inputs in parallel - each worker process streams one
+        # workbook and ships its value rows back, so the XML parsing cost
+        # spreads across CPU cores while the merge itself stays ordered
+        reader = partial(_read_excel_values, default_password=self.default_password)
+        if len(excel_files) == 1:
+            # Spawning a pool for a single file costs more than it saves -
+            # read it inline
+            read_results = [reader(excel_files[0])]
+        else:
+            max_workers = min(len(excel_files), os.cpu_count() or 1)
+            self.logger.info(f"🧵 使用 {max_workers} 个工作进程读取文件")
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                read_results = list(executor.map(reader, excel_files))
+
+        # Process each file's rows in the original order
+        for i, (file_path, read_result) in enumerate(zip(excel_files, read_results)):
+            filename = os.path.basename(file_path)
+            self.logger.debug(f"📖 开始处理文件: {i+1}/{len(excel_files)}: {filename}")
+
+            file_rows, password, error = read_result
+
+            if file_rows is not None:
+                # Only the first rows can be the header, so split that
+                # window off and stream the rest
+                rows_iter = iter(file_rows)
+                head_rows = list(islice(rows_iter, 20))
+
+                # Check if worksheet has any rows
+                if not head_rows:
+                    self.logger.warning(f"⚠️ {filename} - 文件完全为空，跳过")
+                    failed_files.append((filename, "文件完全为空"))
+                    continue
+
+                # Find header row and data rows
+                header_row_index = -1
+                data_rows = []
+
+                # Look for header row
+                for idx, row in enumerate(head_rows):
+                    if self.is_header_row(row):
+                        header_row_index = idx
+                        self.logger.debug(f"🔍 {filename} - Header found at row {idx + 1}")
+                        break
+
+                if header_row_index >= 0:
+                    # Found header, get data rows after header
+                    header_row = head_rows[header_row_index]
+
+                    # Extract and store header values if not done yet
+                    if detected_headers is None:
+                        detected_headers = self.extract_header_from_row(header_row)
+                        self.logger.debug(f"🔍 {filename} - Detected headers: {detected_headers[:5]}...")  # Show first 5
+
+                    potential_data_rows = chain(head_rows[header_row_index + 1:], rows_iter)
+
+                    # Filter non-empty data rows while draining the stream. A
+                    # row counts as data if any cell is non-empty; numbers and
+                    # dates are never empty, so only strings pay for a strip(),
+                    # and any() stops at the first hit instead of building a list
+                    for row in potential_data_rows:
+                        if any(value is not None and (not isinstance(value, str) or value.strip())
+                               for value in row):
+                            data_rows.append(row)
+
+                    self.logger.debug(f"🔍 {filename} - 找到 {len(data_rows)} 行数据")
+
+                else:
+                    # No header found, treat all non-empty rows as data
+                    self.logger.debug(f"🔍 {filename} - 未找到标题，将所有行视为数据")
+                    for row in chain(head_rows, rows_iter):
+                        if any(value is not None and (not isinstance(value, str) or value.strip())
+                               for value in row):
+                            data_rows.append(row)
+
+                # Add header if not added yet and we have detected headers
+                if not header_added and detected_headers is not None:
+                    # Fetch the formatted header cells with a single full (non
+                    # read-only) open of this file - the only place where
+                    # style objects are actually needed
+                    if header_row_index >= 0:
+                        formatted_worksheet, fmt_success, _ = self.read_excel_with_formatting(
+                            file_path, password, read_only=False)
+                        if fmt_success and formatted_worksheet is not None:
+                            formatted_header_cells = formatted_worksheet[header_row_index + 1]
+
+                    # Buffer the actual detected headers for the save step
+                    header_values_out = detected_headers
+                    for col_idx, value in enumerate(header_values_out, 1):
+                        if value is not None:
+                            length = len(str(value))
+                            if length > col_max_len[col_idx]:
+                                col_max_len[col_idx] = length
+                    header_added = True
+                    self.logger.debug(f"📝 {filename} - 添加检测到的标题行并带有格式")
+
+                # Add data rows (values only - per-cell formatting is not
+                # copied any more; only the header keeps its styling)
+                if data_rows:
+                    # Local alias for the row loop - attribute lookups cost
+                    # a LOAD_ATTR per iteration, locals are a plain LOAD_FAST
+                    buffer_row = output_rows.append
+
+                    for row in data_rows:
+                        # Track column display width as we go - this replaces
+                        # a second full sweep over the output at save time
+                        for col_idx, value in enumerate(row, 1):
+                            if value is not None:
+                                length = len(str(value))
+                                if length > col_max_len[col_idx]:
+                                    col_max_len[col_idx] = length
+                        # Rows are never mutated after this point, so the
+                        # source tuples are buffered as-is - no per-row copy
+                        buffer_row(row)
+
+                    successful_files.append(filename)
+                    self.logger.info(f"✅ {filename} - 添加 {len(data_rows)} 行数据并带有格式")
+
+                else:
+                    self.logger.warning(f"⚠️ {filename} - 未找到数据行，跳过")
+                    failed_files.append((filename, "未找到数据行"))
+
+            else:
+                self.logger.error(f"❌ {filename} - 读取失败: {error}")
+                failed_files.append((filename, error))
+        
+        # Generate summary report
+        self.generate_summary_report(successful_files, failed_files)
+
+        if successful_files:
+            # Write-only workbook: appended rows stream straight to the
+            # serializer instead of building the full cell tree in memory
+            output_workbook = Workbook(write_only=True)
+            output_worksheet = output_workbook.create_sheet("Merged Data")
+
+            # Auto-adjust column widths from the maxima accumulated during
+            # the copy pass (write-only sheets require the widths to be set
+            # before any row is appended)
+            self.logger.info("📐 自动调整列宽...")
+            for col_idx, max_length in col_max_len.items():
+                adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
+                output_worksheet.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
+
+            # Header row: WriteOnlyCell objects carrying the source styling
+            if header_values_out is not None:
+                header_cells = []
+                for col_idx, header_value in enumerate(header_values_out):
+                    header_cell = WriteOnlyCell(output_worksheet, value=header_value)
+                    if formatted_header_cells is not None and col_idx < len(formatted_header_cells):
+                        self.copy_cell_formatting(formatted_header_cells[col_idx], header_cell)
+                    else:
+                        # Apply basic header formatting
+                        header_cell.font = Font(bold=True)
+                    header_cells.append(header_cell)
+                output_worksheet.append(header_cells)
+
+            # Data rows: one append per buffered row
+            for row in output_rows:
+                output_worksheet.append(row)
+
+            # Serialize into memory first, then flush to disk with a single
+            # write instead of openpyxl's many small writes to the file
+            save_buffer = io.BytesIO()
+            output_workbook.save(save_buffer)
+            output_workbook.close()
+            with open(output_file, 'wb') as output_handle:
+                output_handle.write(save_buffer.getbuffer())
+
+            total_data_rows = len(output_rows)
+            self.logger.info(f"🎉 成功合并 {len(successful_files)} 个文件并保留格式")
+            self.logger.info(f"📊 合并文件中的总数据行数: {total_data_rows}")
+            self.logger.info(f"💾 输出保存为: {output_file}")
+
+        else:
+            self.logger.error("❌ 未成功读取任何文件中的数据")
+    
+    def generate_summary_report(self, successful_files, failed_files):
+        """Generate a summary report of the merge process"""
+
+        # Build the whole report as one string and emit it through a single
+        # logger call - one handler dispatch instead of one per file
+        lines = []
+
+        if self.verbose:
+            lines.append("=" * 60)
+            lines.append("📊 MERGE SUMMARY REPORT")
+            lines.append("=" * 60)
+
+        lines.append(f"✅ 成功处理文件 ({len(successful_files)}):")
+        if successful_files:
+            lines.extend(f"   {i}. {filename}" for i, filename in enumerate(successful_files, 1))
+        else:
+            lines.append("   None")
+
+        lines.append(f"\n❌ 处理失败的文件 ({len(failed_files)}):")
+        if failed_files:
+            lines.extend(f"   {i}. {filename} - 原因: {error}"
+                         for i, (filename, error) in enumerate(failed_files, 1))
+        else:
+            lines.append("   None")
+
+        success_rate = len(successful_files) / (len(successful_files) + len(failed_files)) * 100 if (successful_files or failed_files) else 0
+        lines.append(f"\n📈 成功率: {success_rate:.1f}%")
+        if self.verbose:
+            lines.append("=" * 60)
+
+        self.logger.info("\n".join(lines))
+
+def main():
+    """
+    Main function to run the Excel merger automatically
+    """
+    # Configuration - SET YOUR PASSWORD HERE
+    DEFAULT_PASSWORD = "8888"  # Change this to your actual password
+    OUTPUT_FILE = "1.xlsx"
+    
+    # --quiet suppresses the decorative banners (useful when the merger
+    # runs inside a batch pipeline); the numeric stats are still logged
+    verbose = "--quiet" not in sys.argv[1:]
+
+    if verbose:
+        print("🚀 自动化 Excel 文件合并器")
+        print("=" * 50)
+        print("此脚本将会：")
+        print("- 自动检测当前目录下的 Excel 文件")
+        print("- 自动检测文件是否加密")
+        print("- 合并所有文件（不重复表头）")
+        print("- 生成详细的日志文件")
+        print("=" * 50)
+
+    # Create merger instance
+    merger = ExcelMerger(default_password=DEFAULT_PASSWORD, verbose=verbose)
+
+    # Run the merger with formatting preserved
+    merger.merge_excel_files_with_formatting(folder_path=".", output_file=OUTPUT_FILE)
+
+    if verbose:
+        print("\n✨ 处理完成！请查看日志文件以获取详细信息。")
+
+if __name__ == "__main__":
+    # Check required packages by presence only - msoffcrypto is a sizeable
+    # extension that is now imported lazily, and only for OLE files, so
+    # actually importing it here would undo that startup saving
+    import importlib.util
+    missing = [name for name in ("pandas", "openpyxl", "msoffcrypto")
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print("缺少必要的包。请使用以下命令安装：")
+        print("pip install pandas openpyxl msoffcrypto-tool")
+        print(f"错误: 缺少 {', '.join(missing)}")
+        exit(1)
+
     main()
\ No newline at end of file